@@ -21,6 +21,7 @@
 
 from __future__ import annotations
 
+import argparse
 import asyncio
 import os
 import sys
@@ -32,20 +33,27 @@ import acp.globus
 from acp.logging import *
 
 
+# Whether stdout is a TTY.  isatty() is a syscall, so check exactly once.
+_IS_TTY = sys.stdout.isatty()
+
+
+
 # The main that dumps us into the async world.
-async def _main():
+async def _main(
+	collection_id: Optional[uuid.UUID] = None,
+):
 	# Let's start out with some setup!
 
-	is_interactive = (True if sys.stdout.isatty() else False)
-	is_ssh = (True if 'SSH_TTY' in os.environ else False)
-	has_display = (True if 'DISPLAY' in os.environ else False)
+	is_interactive = _IS_TTY
+	is_ssh = ('SSH_TTY' in os.environ)
+	has_display = ('DISPLAY' in os.environ)
 
 	# Make sure the DB opens.
-	db = await acp.db.open()
+	db = acp.db.open()
 
 	# Set up Globus.
 	# NOTE: This next call consumes `db`, so delete our reference for safety.
-	g = await acp.globus.get_client(db)
+	g = acp.globus.get_client(db)
 	del db
 
 	# Check to see if a Globus login is required.
@@ -87,75 +95,145 @@ async def _main():
 				print('An error occurred.  Please try again later.')
 				sys.exit(1)
 
-	# Say hello
-	print('Hello ' + acp.globus.get_name(g))
+	# Fetch the authorizers once, for everyone who needs them.
+	authorizers = g.get_authorizers_by_scope()
 
 	# Get our Globus Transfer client
-	globus_transfer = acp.globus.get_transfer_client(g)
-
-	# Look up collections, and see which one we want to use.
-	collections_list = acp.globus.find_collections(globus_transfer)
-	print('')
-	if len(collections_list) > 0:
-		print('You recently interacted with the following Globus collections:')
-		i = 1
-		for collection in collections_list:
-			print(f"{i}d: {collection.uuid}\n    {collection.name}")
-		print('Which AWS S3 collection would you like to use?')
-
-	# Loop until we have a response
-	collection: Optional[acp.globus.GlobusCollection] = None
-	while collection is None:
-		if len(collections_list) > 0:
-			response = input('Enter a number or a collection UUID:')
-		else:
-			response = input('Please enter the UUID of an AWS S3 collection: ')
+	globus_transfer = acp.globus.get_transfer_client(g, authorizers)
+
+	# The userinfo fetch and the collection lookup are independent
+	# network calls, so run both in the executor at the same time.  The
+	# Globus SDK is blocking, hence run_in_executor instead of plain
+	# coroutines.
+	loop = asyncio.get_running_loop()
+	name_task = loop.run_in_executor(
+		None, acp.globus.get_name, g, authorizers,
+	)
+	if collection_id is not None:
+		# The user already told us which collection to use, so look it
+		# up directly, and skip the recently-used search entirely.
+		collection_task = loop.run_in_executor(
+			None, acp.globus.get_collection, globus_transfer, collection_id,
+		)
+	else:
+		collection_task = loop.run_in_executor(
+			None, acp.globus.find_collections, globus_transfer,
+		)
+	try:
+		(name, collection_result) = await asyncio.gather(
+			name_task, collection_task,
+		)
+	except KeyError:
+		print(f"Your UUID, {collection_id}, is not a Globus collection.")
+		sys.exit(1)
 
-		# Test for a number and a UUID
-		response_is_int = False
-		try:
-			response_int = int(response)
-			debug('Response matches an int')
-			response_is_int = True
-		except ValueError:
-			pass
+	# Say hello
+	print('Hello ' + name)
 
-		response_is_uuid = False
-		try:
-			response_uuid = uuid.UUID(response)
-			debug('Response matches a UUID')
-			response_is_uuid = True
-		except ValueError:
-			pass
+	collection: Optional[acp.globus.GlobusCollection] = None
 
-		# If a UUID, test that it's a collection.
-		if response_is_uuid:
-			try:
-				collection = acp.globus.get_collection(
-					globus_transfer,
-					response_uuid,
-				)
-			except KeyError:
-				print(f"Your UUID, {response_uuid}, is not a Globus collection.")
-
-		# If a number, check if it's in range
-		if response_is_int:
-			# We prompted the user starting at one, so adjust.
-			response_int -= 1
-			if (response_int < 0) or (response_int >= len(collections_list)):
-				print(f"Your selection, {response_int}, was out of range.")
+	if collection_id is not None:
+		collection = collection_result
+
+	else:
+		# See which of the recently-used collections we want to use.
+		collections_list = collection_result
+		print('')
+		if len(collections_list) > 0:
+			print('You recently interacted with the following Globus collections:')
+			i = 1
+			for collection in collections_list:
+				print(f"{i}d: {collection.uuid}\n    {collection.name}")
+			print('Which AWS S3 collection would you like to use?')
+
+		# Loop until we have a response
+		collection = None
+		while collection is None:
+			if len(collections_list) > 0:
+				response = input('Enter a number or a collection UUID:')
 			else:
-				# It's in range!  Grab the collection info.
-				collection = collections_list[response_int]
+				response = input('Please enter the UUID of an AWS S3 collection: ')
+
+			# Test for a number and a UUID.  Checking up front avoids the
+			# exception machinery on every mismatched response.
+			response_is_int = False
+			response_is_uuid = False
+			if response.isdigit():
+				response_int = int(response)
+				debug('Response matches an int')
+				response_is_int = True
+			elif len(response) == 36 and response.count('-') == 4:
+				# The length/dash check rejects almost every non-UUID
+				# without touching uuid.UUID or its ValueError.
+				try:
+					response_uuid = uuid.UUID(response)
+					debug('Response matches a UUID')
+					response_is_uuid = True
+				except ValueError:
+					pass
+
+			# If a UUID, test that it's a collection.
+			if response_is_uuid:
+				try:
+					collection = acp.globus.get_collection(
+						globus_transfer,
+						response_uuid,
+					)
+				except KeyError:
+					print(f"Your UUID, {response_uuid}, is not a Globus collection.")
+
+			# If a number, check if it's in range
+			if response_is_int:
+				# We prompted the user starting at one, so adjust.
+				response_int -= 1
+				if (response_int < 0) or (response_int >= len(collections_list)):
+					print(f"Your selection, {response_int}, was out of range.")
+				else:
+					# It's in range!  Grab the collection info.
+					collection = collections_list[response_int]
 
 	print(f"Using collection \"{collection.name}\"")
 
 # Our actual main!
 def main() -> NoReturn:
-	asyncio.run(_main())
+	# Parse the command line.
+	argp = argparse.ArgumentParser(
+		description='Pseudo cross-account AWS S3 transfers with Globus',
+	)
+	argp.add_argument('--collection',
+		metavar='UUID',
+		default=os.environ.get('ACP_COLLECTION'),
+		help=(
+			'The UUID of the AWS S3 collection to use.  May also be set '
+			'via $ACP_COLLECTION.  Skips the search for recently-used '
+			'collections.'
+		),
+	)
+	args = argp.parse_args()
+
+	# If we were given a collection, it had better be a UUID.
+	collection_id: Optional[uuid.UUID] = None
+	if args.collection is not None:
+		try:
+			collection_id = uuid.UUID(args.collection)
+		except ValueError:
+			print(f"'{args.collection}' is not a valid collection UUID.")
+			sys.exit(1)
+
+	# Use uvloop for the event loop, if we have it.  uvloop is a drop-in,
+	# libuv-backed loop that is much faster for I/O-bound work.  It does
+	# not support Windows, so fall back to the stdlib loop without it.
+	try:
+		import uvloop
+		uvloop.install()
+		debug('Using uvloop')
+	except ImportError:
+		debug('uvloop not available, using the default event loop')
+
+	asyncio.run(_main(collection_id))
 
 	# Are we in batch mode?
-	if not sys.stdout.isatty():
+	if not _IS_TTY:
 		print('Sorry, batch mode is not supported yet!')
 		sys.exit(1)
 	else:
@@ -21,10 +21,9 @@
 
 from __future__ import annotations
 
-import aiosqlite
-import functools
 import os
 import pathlib
+import sqlite3
 import sys
 from typing import Optional
 
@@ -37,8 +36,11 @@ from acp.logging import *
 APPLICATION_ID = 1633906688
 
 
+# The memoized result of `db_path`.  `None` means "not yet computed".
+_DB_PATH_CACHE: Optional[pathlib.Path] = None
+
+
 # Memoized function to get the DB path
-@functools.lru_cache
 def db_path() -> pathlib.Path:
 	"""Get the database path.
 
@@ -63,9 +65,20 @@ def db_path() -> pathlib.Path:
 	:raise FileExistsError: The path exists, and is a file.
 	"""
 
+	# If we've already worked out the path, use it.
+	global _DB_PATH_CACHE
+	if _DB_PATH_CACHE is not None:
+		return _DB_PATH_CACHE
+
+	# Grab each environment variable once, up front.  `.get()` is one
+	# dict lookup, instead of the two an `in` check plus subscript costs.
+	acp_db_home = os.environ.get('ACP_DB_HOME')
+	xdg_data_home = os.environ.get('XDG_DATA_HOME')
+	home = os.environ.get('HOME')
+
 	# First preference, use ACP_DB_HOME.
-	if 'ACP_DB_HOME' in os.environ:
-		pathdir = pathlib.Path(os.environ('ACP_DB_HOME'))
+	if acp_db_home is not None:
+		pathdir = pathlib.Path(acp_db_home)
 		debug(f"Using ACP_DB_HOME: {pathdir}")
 
 		# Check if we have `~` in the path, and (if yes) resolve
@@ -75,13 +88,13 @@ def db_path() -> pathlib.Path:
 
 	# If that doesn't exist, check for XDG_DATA_HOME
 	# (See the XDG Base Directory Specification)
-	elif 'XDG_DATA_HOME' in os.environ:
-		pathdir = pathlib.Path(os.environ('XDG_DATA_HOME')) / 'acp'
+	elif xdg_data_home is not None:
+		pathdir = pathlib.Path(xdg_data_home) / 'acp'
 		debug(f"Using XDG_DATA_HOME: {pathdir}")
-	
+
 	# If that doesn't exist, check for HOME, and build a path
-	elif 'HOME' in os.environ:
-		pathdir = pathlib.Path(os.environ['HOME']) / '.local' / 'share' / 'acp'
+	elif home is not None:
+		pathdir = pathlib.Path(home) / '.local' / 'share' / 'acp'
 		debug(f"Using HOME: {pathdir}")
 
 	# If _that_ doesn't exist, then resolve our homedir, and build a path.
@@ -95,24 +108,29 @@ def db_path() -> pathlib.Path:
 	# We have a base directory!
 
 	# If the directory doesn't exist, make it.
-	if not pathdir.exists():
+	# NOTE: One is_dir() call covers both checks, so we only stat once.
+	if not pathdir.is_dir():
+		if pathdir.exists():
+			raise FileExistsError(f"{pathdir} is a file, not a directory.")
 		info(f"Creating directory {pathdir}")
 		pathdir.mkdir(parents=True)
 
-	# We now know that pathdir exists.  Make sure it's not a file.
-	if not pathdir.is_dir():
-		raise FileExistsError(f"{pathdir} is a file, not a directory.")
-
-	# All done!
-	return (pathdir / 'db.sqlite3')
+	# All done!  Cache the result for later calls.
+	_DB_PATH_CACHE = (pathdir / 'db.sqlite3')
+	return _DB_PATH_CACHE
 
 
 # Open a new DB connection
-async def open(
+def open(
 	path: Optional[pathlib.Path] = None,
-) -> aiosqlite.Connection:
+) -> sqlite3.Connection:
 	"""Connect to the DB, preparing/upgrading it as needed
 
+	NOTE: This used to return an async (aiosqlite) connection, but the
+	only real consumer of the DB is the Globus token storage, which is
+	not async.  Opening synchronously means one connection serves
+	everything, instead of an open-close-open dance at startup.
+
 	:param path: The path to the database file.
 
 	:raise sqlite3.DatabaseError: The path is not a SQLite database.
@@ -128,35 +146,57 @@ async def open(
 		new_db = True
 
 	# Connect to the DB
+	# NOTE: check_same_thread is off because the token storage (which ends
+	# up owning this connection) is called from executor worker threads —
+	# get_name runs in run_in_executor.  Access is still one thread at a
+	# time, which is all sqlite3 actually requires.
 	debug(f"Connecting to DB at {path}")
-	conn = await aiosqlite.connect(db_path())
+	conn = sqlite3.connect(path, check_same_thread=False)
 
 	# Is this a new database?  If yes, init the application ID and version.
 	if new_db:
 		debug(f'New DB!  Setting application ID and user_version')
-		await conn.execute(f"PRAGMA application_id = {APPLICATION_ID}")
-		await conn.execute('PRAGMA user_version = 0')
+		conn.execute(f"PRAGMA application_id = {APPLICATION_ID}")
+		conn.execute('PRAGMA user_version = 0')
+		db_user_version = 0
 	else:
+		# Grab the application ID and user_version in a single statement,
+		# via SQLite's pragma table-valued functions.
+		(db_application_id, db_user_version) = conn.execute(
+			'SELECT'
+			' (SELECT * FROM pragma_application_id()),'
+			' (SELECT * FROM pragma_user_version())'
+		).fetchone()
+
 		# Check the existing application ID to make sure it's our DB
-		db_application_id = list(
-			await conn.execute_fetchall('PRAGMA application_id')
-		)[0][0]
 		if db_application_id != APPLICATION_ID:
+			conn.close()
 			raise KeyError(f"DB application ID {db_application_id} does not match expected {APPLICATION_ID}")
 
+	# Now that we know the DB is ours (or brand new), tune the connection,
+	# in one batch.  This must come *after* the application ID check:
+	# journal_mode is persistent, and we don't want to rewrite it in
+	# somebody else's database file.
+	# * WAL journaling and NORMAL synchronous speed up writes considerably.
+	# * Temp storage stays in memory.
+	# * Up to 64 MiB of pages may be cached.
+	conn.executescript('''
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = memory;
+PRAGMA cache_size = -64000;
+	''')
+
 	# Call out to do any needed DB upgrades
-	db_user_version = list(
-		await conn.execute_fetchall('PRAGMA user_version')
-	)[0][0]
-	await _upgrade(conn, db_user_version)
+	_upgrade(conn, db_user_version)
 
 	# Return the prepared DB connection
 	return conn
 
 
 # Upgrade a DB
-async def _upgrade(
-	conn: aiosqlite.Connection,
+def _upgrade(
+	conn: sqlite3.Connection,
 	user_version: int,
 ) -> None:
 	"""Upgrade the DB, if needed.
@@ -171,20 +211,33 @@ async def _upgrade(
 	# 0 -> 1: Add AWS and Globus credentials
 	if user_version == 0:
 		debug('Upgrading DB from 0 to 1')
-		await conn.execute('''
+		conn.execute('''
 CREATE TABLE cred_aws (
     key     TEXT  NOT NULL  PRIMARY KEY,
     secret  TEXT  NOT NULL
 )
 		''')
-		await conn.execute('''
+		conn.execute('''
 CREATE TABLE cred_globus (
     key	    TEXT  NOT NULL  PRIMARY KEY,
     json    TEXT  NOT NULL
 )
 		''')
-		await conn.execute('PRAGMA user_version = 1')
+		conn.execute('PRAGMA user_version = 1')
 		user_version = 1
 
+	# 1 -> 2: Add cached Globus userinfo
+	if user_version == 1:
+		debug('Upgrading DB from 1 to 2')
+		conn.execute('''
+CREATE TABLE cred_userinfo (
+    sub         TEXT  NOT NULL  PRIMARY KEY,
+    name        TEXT  NOT NULL,
+    fetched_at  INT   NOT NULL
+)
+		''')
+		conn.execute('PRAGMA user_version = 2')
+		user_version = 2
+
 	# No more upgrades to do!
 	return
@@ -21,19 +21,22 @@
 
 from __future__ import annotations
 
-import aiosqlite
-import asyncio
+import atexit
 import dataclasses
-import fair_research_login
-import globus_sdk
-import json
+import orjson
 import sqlite3
-from typing import Any
+import time
+from typing import Any, Optional
 import uuid
 
-import acp.db
 from acp.logging import *
 
+# NOTE: `globus_sdk` and `fair_research_login` are imported lazily, inside
+# the functions that need them.  globus_sdk alone drags in requests,
+# urllib3, and cryptography, which is tens of milliseconds of import time
+# that paths like `--help` never need.  Annotations are fine, thanks to
+# `from __future__ import annotations`.
+
 
 # This is the OAuth client ID for our Globus Native App
 GLOBUS_CLIENT_ID = 'f584c7eb-818e-4374-9cbb-037456973b9c'
@@ -45,6 +48,17 @@ REQUIRED_SCOPES = (
 	'urn:globus:auth:scope:transfer.api.globus.org:all',
 )
 
+# How long (in seconds) a cached userinfo entry stays fresh.
+USERINFO_MAX_AGE = 7 * 24 * 60 * 60
+
+
+# The token-write statement lives in one module-level constant: sqlite3
+# caches prepared statements per connection, keyed on the SQL text, so
+# handing it the very same string object on every call guarantees a cache
+# hit with no reparse.
+_INSERT_TOKEN_SQL = \
+	'INSERT OR REPLACE INTO cred_globus (key, json) VALUES (?, ?)'
+
 
 # First, make a class to provide for token storage, using our DB
 class TokenStorage:
@@ -61,24 +75,28 @@ class TokenStorage:
 		self.db = db
 
 
-	def __del__(self):
-		# Close the DB connection.
+	def close(self) -> None:
+		"""Close the DB connection.
 
-		# NOTE: This is non-obvious, because the destructor is not
-		# asynchronous, but the database handle is.
-		# So, we have to reach out, grab the event loop, and add our coroutine
-		# to it.
+		NOTE: This used to happen in a `__del__` destructor, but that is
+		fragile: at interpreter shutdown, sqlite3 may already be partially
+		torn down, and objects with destructors get special (slower)
+		treatment from the garbage collector.  Instead, `get_client`
+		registers this method with `atexit`.
+		"""
+		debug('Closing token storage DB connection')
 		self.db.close()
-	
 
 	def read_tokens(self) -> dict[str, Any]:
 		debug('Entering')
-		result: dict[str, Any] = dict()
 
-		# Pull all rows from the Globus credentials table
-		for row in self.db.execute('SELECT key, json FROM cred_globus'):
-			# JSON-decode and add to our result
-			result[row[0]] = json.loads(row[1])
+		# Pull all rows from the Globus credentials table in one shot,
+		# then JSON-decode each row into our result.
+		rows = self.db.execute('SELECT key, json FROM cred_globus').fetchall()
+		result: dict[str, Any] = {
+			key: orjson.loads(token_json)
+			for (key, token_json) in rows
+		}
 
 		# Return!
 		debug(f"Read {len(result)} tokens from storage")
@@ -89,19 +107,19 @@ class TokenStorage:
 		tokens: dict[str, Any],
 	) -> None:
 		debug('Entering')
-		self.db.execute('BEGIN')
 		# Each token is JSON-encoded, and inserted into the DB.
 		# If an entry with the same key is already there, that entry is
 		# replaced with the new entry.
+		# One executemany call lets SQLite prepare the statement once, and
+		# the `with` block wraps everything in a single transaction.
 		debug(f"Writing {len(tokens)} tokens to storage")
-		for token in tokens:
-			token_json = json.dumps(tokens[token])
-			self.db.execute('''
-INSERT OR REPLACE INTO cred_globus (key, json) VALUES (?, ?)
-				''',
-				(token, token_json),
-			)
-		self.db.commit()
+		# NOTE: orjson emits bytes, but the `json` column is TEXT, so decode.
+		rows = [
+			(key, orjson.dumps(value).decode('utf-8'))
+			for (key, value) in tokens.items()
+		]
+		with self.db:
+			self.db.executemany(_INSERT_TOKEN_SQL, rows)
 		return
 
 
@@ -109,10 +127,42 @@ INSERT OR REPLACE INTO cred_globus (key, json) VALUES (?, ?)
 		debug('Entering')
 		self.db.execute('BEGIN')
 		self.db.execute('DELETE FROM cred_globus')
+		# Cached userinfo came from these tokens, so it goes too.
+		self.db.execute('DELETE FROM cred_userinfo')
 		self.db.commit()
 		return
 
 
+	def read_userinfo(self) -> Optional[tuple[str, int]]:
+		"""Return the cached userinfo, if we have any.
+
+		:returns: A (name, fetched_at) tuple, or None if nothing is cached.
+		"""
+		debug('Entering')
+		return self.db.execute(
+			'SELECT name, fetched_at FROM cred_userinfo LIMIT 1'
+		).fetchone()
+
+
+	def write_userinfo(self,
+		sub: str,
+		name: str,
+	) -> None:
+		"""Cache userinfo for later runs.
+
+		:param sub: The OIDC subject identifier.
+
+		:param name: The display name.
+		"""
+		debug(f"Caching userinfo for {sub}")
+		with self.db:
+			self.db.execute(
+				'INSERT OR REPLACE INTO cred_userinfo (sub, name, fetched_at) VALUES (?, ?, ?)',
+				(sub, name, int(time.time())),
+			)
+		return
+
+
 @dataclasses.dataclass(
 	frozen=True
 )
@@ -122,22 +172,22 @@ class GlobusCollection:
 	server: str
 
 
-async def get_client(
-	db: aiosqlite.Connection,
+def get_client(
+	db: sqlite3.Connection,
 ) -> fair_research_login.NativeClient:
 	"""
 	"""
 
 	debug('Spawning token storage')
-	# NOTE: This is a hack, since Globus stuff is not async.
+	# The one connection opened by acp.db.open is handed straight to the
+	# token storage, which owns it from here on.
 	token_storage = TokenStorage(
-		db = sqlite3.connect(acp.db.db_path()),
+		db = db,
 	)
-
-	# Since we officially consume db, close it now.
-	await db.close()
+	atexit.register(token_storage.close)
 
 	# Create and return the client!
+	import fair_research_login
 	return fair_research_login.NativeClient(
 		client_id = GLOBUS_CLIENT_ID,
 		app_name = 'AWS S3 Copy post-transfer',
@@ -147,38 +197,67 @@ async def get_client(
 
 
 def get_transfer_client(
-	client: fair_research_login.NativeClient
+	client: fair_research_login.NativeClient,
+	authorizers: Optional[dict[str, Any]] = None,
 ) -> globus_sdk.TransferClient:
 	"""Return a ready-to-use Globus Transfer client.
 
 	:param client: The native client.
 
+	:param authorizers: The client's authorizers-by-scope dict, if the
+	caller already has it.  Building the dict iterates over all stored
+	tokens, so callers making several of these calls should fetch it once
+	and pass it in.
+
 	:returns: A Globus Transfer client.
 	"""
 
+	import globus_sdk
+
+	if authorizers is None:
+		authorizers = client.get_authorizers_by_scope()
 	transfer_client = globus_sdk.TransferClient(
-		authorizer=client.get_authorizers_by_scope()['urn:globus:auth:scope:transfer.api.globus.org:all']
+		authorizer=authorizers['urn:globus:auth:scope:transfer.api.globus.org:all']
 	)
 	return transfer_client
 
 
 def get_name(
-	client: fair_research_login.NativeClient
+	client: fair_research_login.NativeClient,
+	authorizers: Optional[dict[str, Any]] = None,
 ) -> str:
 	"""Return the name of the person who authenticated.
 
 	:param client: The native client.
 
+	:param authorizers: The client's authorizers-by-scope dict, if the
+	caller already has it.
+
 	:returns: The name (as a 'display name').
 	"""
 
+	# If we have a fresh-enough cached name, skip the network round-trip.
+	# NOTE: The NativeClient holds on to the TokenStorage we gave it.
+	storage = client.token_storage
+	cached = storage.read_userinfo()
+	if cached is not None:
+		(name, fetched_at) = cached
+		if (time.time() - fetched_at) < USERINFO_MAX_AGE:
+			debug('Using cached userinfo')
+			return name
+
 	# We'll need a Globus Auth client for this.
+	import globus_sdk
+
+	if authorizers is None:
+		authorizers = client.get_authorizers_by_scope()
 	auth_client = globus_sdk.AuthClient(
-		authorizer=client.get_authorizers_by_scope()['openid']
+		authorizer=authorizers['openid']
 	)
 
-	# Get the userinfo, and return a name
+	# Get the userinfo, cache it, and return a name
 	user_info = auth_client.oauth2_userinfo()
+	storage.write_userinfo(user_info['sub'], user_info['name'])
 	return user_info['name']
 
 
@@ -187,30 +266,25 @@ def needs_login(
 ) -> bool:
 	"""
 	"""
-	result = True
+	import fair_research_login
 
 	debug('Trying to load tokens')
 	try:
 		client.load_tokens()
 
-		# Check for all of our scopes
-		all_scopes_found = True
+		# Check for all of our scopes.
+		# Any missing scope means we need login, so stop at the first one.
 		authorizers_by_scope = client.get_authorizers_by_scope()
 		for scope in REQUIRED_SCOPES:
 			if scope not in authorizers_by_scope:
-				all_scopes_found = False
-
-		# If we missed any scopes, then we need login.
-		if not all_scopes_found:
-			result = True
-		else:
-			result = False
+				return True
 
 	# If we had a problem loading/refreshing any tokens, then we need login.
 	except fair_research_login.LoadError:
-		result = True
+		return True
 
-	return result
+	# We loaded tokens, and all scopes are covered.
+	return False
 
 
 def find_collections(
@@ -224,20 +298,21 @@ def find_collections(
 	"""
 	debug('Searching for recently-used collections')
 
-	endpoints: list[GlobusEndpoint] = list()
 	search_results = client.endpoint_search(
 		filter_scope='recently-used',
 		limit=10,
 	)
-	for endpoint in search_results:
-		endpoints.push(GlobusEndpoint(
+	collections = [
+		GlobusCollection(
 			uuid = uuid.UUID(endpoint['id']),
 			name = endpoint['display_name'],
-			server = endpoint['DATA'][0]['hostname']
-		))
+			server = endpoint['DATA'][0]['hostname'],
+		)
+		for endpoint in search_results
+	]
 
-	debug(f"Found {len(endpoints)} results")
-	return endpoints
+	debug(f"Found {len(collections)} results")
+	return collections
 
 
 def get_collection(
@@ -257,6 +332,7 @@ def get_collection(
 	:raise KeyError: The UUID is not a Collection UUID.
 	"""
 	debug(f"Searching for collection {collection_id}")
+	import globus_sdk
 
 	# Use the fulltext search for a UUID
 	search_results: Optional[globus_sdk.GlobusHTTPResponse] = None
@@ -269,9 +345,9 @@ def get_collection(
 
 	if search_results is not None:
 		return GlobusCollection(
-			uuid = search_results['id'],
+			uuid = uuid.UUID(search_results['id']),
 			name = search_results['display_name'],
-			server = search_results['DATA'][0]['hostname']
+			server = search_results['DATA'][0]['hostname'],
 		)
 	else:
 		raise KeyError(str(collection_id))
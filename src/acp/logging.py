@@ -21,31 +21,286 @@
 
 from __future__ import annotations
 
+import atexit
 import logging
-import sys
+import logging.handlers
+import os
+import queue
+import time
 
 
 # Export logging endpoints
-__all__ = ['debug', 'info', 'warning', 'error']
+__all__ = ['debug', 'info', 'warning', 'error', 'set_level', 'reenable']
+
+
+# None of our formats show thread, process, or task names, but
+# LogRecord.__init__ looks all of them up for every record (getpid, the
+# current thread, multiprocessing's current process) unless these flags
+# are off.  Skip that work.
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+if hasattr(logging, 'logAsyncioTasks'):  # Added in Python 3.12
+	logging.logAsyncioTasks = False
 
 
 # Have a logger for library stuff
 lib_logger = logging.getLogger(__name__)
 
-# Library messages go to stdout
-lib_handler = logging.StreamHandler()
-lib_logger.addHandler(lib_handler)
+# Don't propagate to the root logger: its handler would print everything a
+# second time, and its level would second-guess ours.
+lib_logger.propagate = False
+
+
+class BatchedStderrHandler(logging.Handler):
+	"""Batch formatted records and write them straight to stderr.
+
+	Records are formatted on arrival into one bytes buffer, which goes
+	out through a single os.write to file descriptor 2 when the batch
+	fills (or on anything at ERROR and above, or on flush).  Compared to
+	a StreamHandler on sys.stderr, a burst of log lines costs one write
+	syscall instead of one per line, and the raw descriptor skips the
+	TextIOWrapper lock and per-line re-encoding.
+
+	:param capacity: Flush after this many buffered records.
+	"""
+
+	def __init__(self,
+		capacity: int = 512,
+	) -> None:
+		super().__init__()
+		self._buf = bytearray()
+		self._buf_records = 0
+		self._capacity = capacity
+
+	def emit(self,
+		record: logging.LogRecord,
+	) -> None:
+		try:
+			self._buf += self.format(record).encode('utf-8', 'replace')
+			self._buf += b'\n'
+			self._buf_records += 1
+			if (
+				(self._buf_records >= self._capacity)
+				or (record.levelno >= logging.ERROR)
+			):
+				self.flush()
+		except Exception:
+			self.handleError(record)
+
+	def flush(self) -> None:
+		self.acquire()
+		try:
+			if len(self._buf) > 0:
+				os.write(2, self._buf)
+				self._buf.clear()
+				self._buf_records = 0
+		finally:
+			self.release()
+
+
+# Library messages go to stderr, in batches.  Anything at ERROR or above
+# flushes the batch immediately, as does exit.
+lib_handler = BatchedStderrHandler(capacity=512)
+
+# Did this module's import actually attach the handlers?
+_configured = False
+
+# Guard the attachment: the logger object outlives this module's globals,
+# so a re-import (tests, reload, entry-point rediscovery) must not stack a
+# second QueueHandler and listener on it.  Duplicates would silently
+# double every record's work and output.
+if not lib_logger.handlers:
+	atexit.register(lib_handler.flush)
+
+	# The logger itself only gets a QueueHandler: a log call on the
+	# caller's side is just "build record, enqueue", with no handler lock
+	# or I/O.  A QueueListener drains the queue on its own background
+	# thread and feeds the batching handler above, so emission never
+	# serializes worker threads.
+	_queue: queue.SimpleQueue = queue.SimpleQueue()
+	lib_logger.addHandler(logging.handlers.QueueHandler(_queue))
+
+	_listener = logging.handlers.QueueListener(
+		_queue,
+		lib_handler,
+		respect_handler_level = True,
+	)
+	_listener.start()
+
+	# atexit runs last-registered first: the listener stops (draining the
+	# queue into the batching handler), and then the batch flushes.
+	atexit.register(_listener.stop)
+
+	_configured = True
+
+# Remember the original _srcfile, so debugging can be switched back on.
+_SRCFILE = logging._srcfile
+
+
+class FastFormatter(logging.Formatter):
+	"""A formatter that skips the named-field `%` machinery.
+
+	The stock Formatter pushes every record through PercentStyle, which
+	interpolates the template against the record's entire `__dict__`.
+	Our two templates are fixed, so formatting can be one positional
+	interpolation of exactly the fields we show.
+
+	When debugging, messages show time, function, file, and message.  The
+	caller fields are expensive: Logger._log only learns them by walking
+	the stack (findCaller), with path normalization per record.  So,
+	above DEBUG we use a format without them; `set_level` also switches
+	the stack walk off entirely by clearing logging._srcfile (that's the
+	flag _log checks).
 
-# Library messages show time, function, file, and message
-lib_formatter = \
-	logging.Formatter('%(asctime)s [%(filename)s:%(lineno)d] (%(funcName)s) %(message)s')
+	:param show_caller: Include the file, line, and function fields.
+	"""
+
+	def __init__(self,
+		show_caller: bool = False,
+	) -> None:
+		super().__init__()
+		self._show_caller = show_caller
+
+		# The last-formatted second, and its formatted string.  Timestamps
+		# repeat at seconds resolution during bursts, so cache the
+		# strftime result and only recompute when the second rolls over.
+		# NOTE: No lock needed; only the queue listener thread formats.
+		self._last_sec = -1
+		self._last_str = ''
+
+	def formatTime(self,
+		record: logging.LogRecord,
+		datefmt=None,
+	) -> str:
+		sec = int(record.created)
+		if sec != self._last_sec:
+			self._last_sec = sec
+			self._last_str = time.strftime(
+				self.default_time_format,
+				self.converter(record.created),
+			)
+		# Milliseconds vary within the second, so they're appended fresh.
+		return self.default_msec_format % (self._last_str, record.msecs)
+
+	def format(self,
+		record: logging.LogRecord,
+	) -> str:
+		# str.join on a small tuple beats str.__mod__: there's no format
+		# template to scan, just C-level concatenation.
+		if self._show_caller:
+			return ''.join((
+				self.formatTime(record),
+				' [', record.filename,
+				':', str(record.lineno),
+				'] (', record.funcName,
+				') ', record.getMessage(),
+			))
+		return ''.join((
+			self.formatTime(record),
+			' ',
+			record.getMessage(),
+		))
+
+
+lib_formatter = FastFormatter()
 lib_handler.setFormatter(lib_formatter)
 
-# Default logging level is WARNING for lib
-lib_logger.setLevel(logging.DEBUG)
 
-# These are the library logging endpoints
-debug = lib_logger.debug
-info = lib_logger.info
-warning = lib_logger.warning
-error = lib_logger.error
+def set_level(
+	level,
+) -> None:
+	"""Set the library logging level.
+
+	At DEBUG and below, log messages gain the caller's file, line, and
+	function, and the (costly) per-record stack walk that finds them is
+	enabled.
+
+	:param level: A logging level, either numeric or a name (like 'DEBUG').
+	An unrecognized level falls back to WARNING, with a complaint; a typo
+	in $ACP_LOG_LEVEL shouldn't make the whole tool unusable.
+	"""
+	global lib_formatter
+	if isinstance(level, str):
+		if level.isdigit():
+			# Numeric levels arrive as strings from the environment.
+			level = int(level)
+		else:
+			level_name = level.upper()
+			level = logging.getLevelName(level_name)
+			# For unknown names, getLevelName hands back a 'Level X'
+			# string instead of an int.
+			if not isinstance(level, int):
+				lib_logger.warning(
+					"Unknown log level '%s', using WARNING", level_name,
+				)
+				level = logging.WARNING
+	lib_logger.setLevel(level)
+
+	# If this copy of the module never attached its handler, there's no
+	# formatter of ours to swap.
+	if not _configured:
+		return
+
+	# Pick the matching format, and only pay for findCaller when the
+	# caller fields will actually be shown.
+	if lib_logger.isEnabledFor(logging.DEBUG):
+		lib_formatter = FastFormatter(show_caller=True)
+		logging._srcfile = _SRCFILE
+	else:
+		lib_formatter = FastFormatter()
+		logging._srcfile = None
+	lib_handler.setFormatter(lib_formatter)
+
+
+# Default logging level is WARNING for lib, so suppressed debug()/info()
+# calls stop at a single level check, before a LogRecord is ever built.
+# $ACP_LOG_LEVEL raises (or lowers) verbosity.
+set_level(os.environ.get('ACP_LOG_LEVEL', logging.WARNING))
+
+# These are the library logging endpoints.  Each is a thin wrapper that
+# checks the level up front, so a suppressed call costs one integer
+# compare and nothing else.  The message may also be a zero-argument
+# callable, invoked only if the record will actually be emitted — use
+# that (or '%s'-style args) instead of f-strings for anything that is
+# expensive to format.
+def _make_endpoint(level: int):
+	logger = lib_logger
+	def endpoint(msg, *args, **kwargs) -> None:
+		if logger.isEnabledFor(level):
+			if callable(msg):
+				msg = msg()
+			# stacklevel=2 makes findCaller skip this wrapper frame.
+			logger._log(level, msg, args, stacklevel=2, **kwargs)
+	return endpoint
+
+debug = _make_endpoint(logging.DEBUG)
+info = _make_endpoint(logging.INFO)
+warning = _make_endpoint(logging.WARNING)
+error = _make_endpoint(logging.ERROR)
+
+
+def _noop(*args, **kwargs) -> None:
+	return None
+
+
+def reenable() -> None:
+	"""Undo $ACP_LOG_DISABLE, restoring the real logging endpoints.
+
+	This is mainly for tests.  NOTE: It rebinds this module's attributes;
+	anything that star-imported the no-op bindings beforehand keeps them.
+	"""
+	global debug, info, warning
+	debug = _make_endpoint(logging.DEBUG)
+	info = _make_endpoint(logging.INFO)
+	warning = _make_endpoint(logging.WARNING)
+	logging.disable(logging.NOTSET)
+
+
+# $ACP_LOG_DISABLE cuts logging down to almost nothing: debug, info, and
+# warning become no-op functions (no level check, no record, no handler),
+# and everything below ERROR is switched off globally, which also quiets
+# third-party loggers routed through the root.  error stays live.
+if os.environ.get('ACP_LOG_DISABLE'):
+	debug = info = warning = _noop
+	logging.disable(logging.WARNING)